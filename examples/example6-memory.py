@@ -7,10 +7,14 @@
     has other ways to store data, namely memories and ROMs.
 """
 
+import array
+import os
 import random
+import subprocess
 
 import pyrtl
 from pyrtl import *
+from pyrtl.rtllib.libutils import enabled_inc
 
 # --- Part 1: Memories -------------------------------------------------------
 
@@ -59,9 +63,12 @@ mem1[waddr] <<= WE(wdata, we)  # Uses input wire
 mem2[count] <<= WE(wdata, we)  # Uses count register
 
 # Now we will finish up the circuit
-# We will increment count register on each write
+# We will increment count register on each write.  We could write this as
+# select(we, falsecase=count, truecase=count + 1), but enabled_inc from the
+# rtllib builds the same thing out of a single adder by adding the one bit
+# write enable itself to count.
 
-count.next <<= select(we, falsecase=count, truecase=count + 1)
+count.next <<= enabled_inc(count, we)
 
 # we will also verify that the two write address are always the same
 
@@ -78,96 +85,140 @@ simvals = {
     'raddr':     "00000000000000000123456777"
 }
 
+# The strings above are easy to read, but each character still has to be turned
+# into an integer before it can be handed to the simulator.  Rather than calling
+# int() on every character of every cycle inside the simulation loop, we decode
+# each string once, up front.  Each digit is just its character code minus that
+# of '0', and a bytearray holds one small integer per byte (indexing it gives
+# back ints, just like a list would).
+stimulus = {k: bytearray(ord(c) - ord('0') for c in v) for k, v in simvals.items()}
+
 # for simulation purposes, we can give the spots in memory an initial value
 # note that in the actual circuit, the values are initially undefined
 # below, we are building the data with which to initialize memory
-mem1_init = {addr: 9 for addr in range(8)}
-mem2_init = {addr: 9 for addr in range(8)}
+mem_init = dict.fromkeys(range(8), 9)
 
 # The simulation only recognizes initial values of memories when they are in a
-# dictionary composing of memory : mem_values pairs.
-memvals = {mem1: mem1_init, mem2: mem2_init}
+# dictionary composing of memory : mem_values pairs.  The simulation makes its
+# own copy of each initial map, so both memories can share the same one.
+memvals = {mem1: mem_init, mem2: mem_init}
 
 # now run the simulation like before. Note the adding of the memory
-# value map.
+# value map.  Rather than the (slow but simple) pyrtl.Simulation, here we use
+# CompiledSimulation, which turns the whole block into C code once up front so
+# that each step does no Python-level walking of the netlist.  It needs a
+# working C compiler, so if it cannot be built we fall back to FastSimulation,
+# which instead compiles the block into a single Python function.  Because
+# CompiledSimulation can only trace inputs and outputs, we explicitly list the
+# wires to track so that the trace looks the same with either simulator.
 print("---------memories----------")
 print(pyrtl.working_block())
-sim_trace = pyrtl.SimulationTrace()
-sim = pyrtl.Simulation(tracer=sim_trace, memory_value_map=memvals)
-for cycle in range(len(simvals['we'])):
-    sim.step({k: int(v[cycle]) for k, v in simvals.items()})
+sim_trace = pyrtl.SimulationTrace(wires_to_track=[we, waddr, wdata, raddr,
+                                                  rdata1, rdata2, validate])
+try:
+    sim = pyrtl.CompiledSimulation(tracer=sim_trace, memory_value_map=memvals)
+except (OSError, subprocess.CalledProcessError):
+    sim = pyrtl.FastSimulation(tracer=sim_trace, memory_value_map=memvals)
+# Since we already know the inputs for every cycle, rather than calling
+# sim.step once per cycle we can hand all of them to step_multiple at once.
+# CompiledSimulation then runs every cycle in a single call into C.
+sim.step_multiple(stimulus)
 sim_trace.render_trace()
 
-# cleanup in preparation for the rom example
-pyrtl.reset_working_block()
+# For really long simulations (many millions of cycles) it can pay to hand the
+# design off to a dedicated Verilog simulator such as Icarus Verilog or
+# Verilator, which compiles the whole circuit ahead of time.  PyRTL can write out
+# both the Verilog for the circuit and a testbench that replays the inputs
+# recorded in our trace.  Set the environment variable PYRTL_VERILOG_DIR to a
+# directory to have this example write them there as "memory.v".  Note that the
+# testbench starts the memories out as all zeros rather than with our memvals.
+verilog_dir = os.environ.get('PYRTL_VERILOG_DIR')
+if verilog_dir:
+    with open(os.path.join(verilog_dir, 'memory.v'), 'w') as vfile:
+        pyrtl.output_to_verilog(vfile)
+        pyrtl.output_verilog_testbench(vfile, sim_trace, vcd='memory.vcd')
 
 # --- Part 2: ROMs -----------------------------------------------------------
 
-# ROMs are another type of memory. Unlike normal memories, ROMs are read only
-# and therefore only have read ports. They are used to store predefined data
+# Rather than throwing away the memory circuit built above with
+# pyrtl.reset_working_block(), we build the ROM example inside a temporary
+# block.  Everything created in the "with" below goes into that new block, and
+# when it ends the memory circuit is the working block once again.
 
-# There are two different ways to define the data stored in the ROMs
-# either through passing a function or though a list or tuple
+with pyrtl.temp_working_block():
 
+    # ROMs are another type of memory. Unlike normal memories, ROMs are read only
+    # and therefore only have read ports. They are used to store predefined data
 
-def rom_data_func(address):
-    return 31 - 2 * address
+    # There are two different ways to define the data stored in the ROMs
+    # either through passing a function or though a list, tuple, or other sequence
 
-rom_data_array = [rom_data_func(a) for a in range(16)]
+    def rom_data_func(address):
+        return 31 - 2 * address
 
-# Now we will make the ROM blocks. ROM blocks are similar to memory blocks
-# but because they are read only, they also need to be passed in a set of
-# data to be initialized as
+    # A function is handy: the ROM calls it once per address the first time that
+    # address is needed (by a simulation or when exporting Verilog) and remembers
+    # the answer.  Those remembered answers are kept as full Python integers in a
+    # dictionary, though, so for a large ROM it is better to evaluate the function
+    # over every address up front and hand the resulting table to the ROM instead.
+    # Any indexable sequence of integers works as the table; an array.array of
+    # unsigned bytes stores each entry in a single byte, which matters once a
+    # ROM has many thousands of entries.
+    rom_data_array = array.array('B', (rom_data_func(a) for a in range(1 << 4)))
 
-# FIXME: rework how memassigns work to account for more read ports
-rom1 = RomBlock(bitwidth=5, addrwidth=4, romdata=rom_data_func, max_read_ports=10)
-rom2 = RomBlock(5, 4, rom_data_array, max_read_ports=10)
+    # Now we will make the ROM blocks. ROM blocks are similar to memory blocks
+    # but because they are read only, they also need to be passed in a set of
+    # data to be initialized as
 
-rom_add_1, rom_add_2 = Input(4, "rom_in"), Input(4, "rom_in_2")
+    # FIXME: rework how memassigns work to account for more read ports
+    rom1 = RomBlock(bitwidth=5, addrwidth=4, romdata=rom_data_func, max_read_ports=10)
+    rom2 = RomBlock(5, 4, rom_data_array, max_read_ports=10)
 
-rom_out_1, rom_out_2 = Output(5, "rom_out_1"), Output(5, "rom_out_2")
-rom_out_3, cmp_out = Output(5, "rom_out_3"), Output(1, "cmp_out")
+    rom_add_1, rom_add_2 = Input(4, "rom_in"), Input(4, "rom_in_2")
 
-# Because output wirevectors cannot be used as the source for other nets,
-# in order to use the rom outputs in two different places, we must instead
-# assign them to a temporary variable.
+    rom_out_1, rom_out_2 = Output(5, "rom_out_1"), Output(5, "rom_out_2")
+    rom_out_3, cmp_out = Output(5, "rom_out_3"), Output(1, "cmp_out")
 
-temp1 = rom1[rom_add_1]
-temp2 = rom2[rom_add_1]
+    # Because output wirevectors cannot be used as the source for other nets,
+    # in order to use the rom outputs in two different places, we must instead
+    # assign them to a temporary variable.
 
-rom_out_3 <<= rom2[rom_add_2]
+    temp1 = rom1[rom_add_1]
+    temp2 = rom2[rom_add_1]
 
-# now we will connect the rest of the outputs together
+    rom_out_3 <<= rom2[rom_add_2]
 
-rom_out_1 <<= temp1
-rom_out_2 <<= temp2
+    # now we will connect the rest of the outputs together
 
-cmp_out <<= temp1 == temp2
+    rom_out_1 <<= temp1
+    rom_out_2 <<= temp2
 
-# One of the things that is useful to have is repeatability, However, we
-# also don't want the hassle of typing out a set of values to test. One
-# solution in this case is to seed random and then pulling out 'random'
-# numbers from it.
-print("---------roms----------")
-print(pyrtl.working_block())
-random.seed(4839483)
+    cmp_out <<= temp1 == temp2
 
-# Now we will create a new set of simulation values. In this case, since we
-# want to use simulation values that are larger than 9 we cannot use the
-# trick used in previous examples to parse values. The two ways we are doing
-# it below are both valid ways of making larger values
+    # One of the things that is useful to have is repeatability, However, we
+    # also don't want the hassle of typing out a set of values to test. One
+    # solution in this case is to seed random and then pulling out 'random'
+    # numbers from it.
+    print("---------roms----------")
+    print(pyrtl.working_block())
+    random.seed(4839483)
 
-simvals = {
-    'rom_in': [1, 11, 4, 2, 7, 8, 2, 4, 5, 13, 15, 3, 4, 4, 4, 8, 12, 13, 2, 1],
-    'rom_in_2': [random.randrange(0, 16) for i in range(20)]
-}
+    # Now we will create a new set of simulation values. In this case, since we
+    # want to use simulation values that are larger than 9 we cannot use the
+    # trick used in previous examples to parse values. The two ways we are doing
+    # it below are both valid ways of making larger values
 
-# Now run the simulation like before. Note that for ROMs, we do not
-# supply a memory value map because ROMs are defined with the values
-# predefined.
+    simvals = {
+        'rom_in': [1, 11, 4, 2, 7, 8, 2, 4, 5, 13, 15, 3, 4, 4, 4, 8, 12, 13, 2, 1],
+        'rom_in_2': [random.randrange(0, 16) for i in range(20)]
+    }
 
-sim_trace = pyrtl.SimulationTrace()
-sim = pyrtl.Simulation(tracer=sim_trace)
-for cycle in range(len(simvals['rom_in'])):
-    sim.step({k: v[cycle] for k, v in simvals.items()})
-sim_trace.render_trace()
+    # Now run the simulation like before. Note that for ROMs, we do not
+    # supply a memory value map because ROMs are defined with the values
+    # predefined.
+
+    sim_trace = pyrtl.SimulationTrace()
+    sim = pyrtl.Simulation(tracer=sim_trace)
+    for cycle in range(len(simvals['rom_in'])):
+        sim.step({k: v[cycle] for k, v in simvals.items()})
+    sim_trace.render_trace()
@@ -13,7 +13,7 @@ from .core import working_block
 from .wire import Input, Output, Const, WireVector, Register
 from .memory import RomBlock
 from .pyrtlexceptions import PyrtlError, PyrtlInternalError
-from .simulation import SimulationTrace
+from .simulation import SimulationTrace, _inputs_per_step
 
 
 __all__ = ['CompiledSimulation']
@@ -128,6 +128,14 @@ class CompiledSimulation(object):
         """
         self.run([inputs])
 
+    def step_multiple(self, provided_inputs, nsteps=None):
+        """Run many steps of the simulation.
+
+        The argument is a mapping from input names to a sequence of values,
+        one for each step; all of the steps are run in a single call into C.
+        """
+        self.run(list(_inputs_per_step(provided_inputs, nsteps)))
+
     def run(self, inputs):
         """Run many steps of the simulation.
 
@@ -286,17 +294,17 @@ class CompiledSimulation(object):
         if isinstance(mem, RomBlock):
             # extract data from mem
             romval = [mem._get_read_data(n) for n in range(1 << mem.addrwidth)]
-            write('static const uint{width}_t {name}[][{limbs}] = {{'.format(
+            write('static const uint{width}_t {name}[][{limbs}] CACHE_ALIGNED = {{'.format(
                 name=vn, width=self._memwidth(mem), limbs=self._limbs(mem)))
             for rv in romval:
                 write(self._makeini(mem, rv)+',')
             write('};')
         else:
             write('EXPORT')
-            if mem in self._memmap:
+            if self._memmap.get(mem):  # an empty map is the same as no map
                 highest = min(1 << mem.addrwidth, max(self._memmap[mem])+1)
                 memval = [self._memmap[mem].get(n, 0) for n in range(highest)]
-                write('uint{width}_t {name}[{size}][{limbs}] = {{'.format(
+                write('uint{width}_t {name}[{size}][{limbs}] CACHE_ALIGNED = {{'.format(
                     name=vn, width=self._memwidth(mem),
                     size=1 << mem.addrwidth, limbs=self._limbs(mem)))
                 for mv in memval:
@@ -304,7 +312,7 @@ class CompiledSimulation(object):
                 write('};')
             else:
                 # initialize to zero by default
-                write('uint{width}_t {name}[{size}][{limbs}] = {{{{0}}}};'.format(
+                write('uint{width}_t {name}[{size}][{limbs}] CACHE_ALIGNED = {{{{0}}}};'.format(
                     name=vn, width=self._memwidth(mem),
                     size=1 << mem.addrwidth, limbs=self._limbs(mem)))
 
@@ -356,12 +364,13 @@ class CompiledSimulation(object):
                 mask=self._makemask(dest, None, n)))
 
     def _build_eq(self, write, op, param, args, dest):
-        cond = []
+        # branchless: or together the xor of every limb, equal only if nothing differs
+        diff = []
         for n in range(max(self._limbs(args[0]), self._limbs(args[1]))):
             arg0 = self._getarglimb(args[0], n)
             arg1 = self._getarglimb(args[1], n)
-            cond.append('({arg0}=={arg1})'.format(arg0=arg0, arg1=arg1))
-        write('{dest}[0] = {cond};'.format(dest=self.varname[dest], cond='&&'.join(cond)))
+            diff.append('({arg0}^{arg1})'.format(arg0=arg0, arg1=arg1))
+        write('{dest}[0] = !({diff});'.format(dest=self.varname[dest], diff='|'.join(diff)))
 
     def _build_cmp(self, write, op, param, args, dest):  # <, > only
         cond = None
@@ -479,6 +488,9 @@ class CompiledSimulation(object):
         else:
             write('#define EXPORT')
 
+        # start memories on a cache line so small ones sit in a single line
+        write('#define CACHE_ALIGNED __attribute__((aligned(64)))')
+
         # multiplication macro
         #  for efficient 64x64 -> 128 bit multiplication without uint128_t
         #  as -O0 optimization does not handle uint128_t well
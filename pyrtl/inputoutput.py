@@ -7,8 +7,9 @@ accordingly, or write information from the Block out to the file.
 """
 
 from __future__ import print_function, unicode_literals
-import re
 import collections
+import itertools
+import six
 
 from .pyrtlexceptions import PyrtlError, PyrtlInternalError
 from .core import working_block, _NameSanitizer
@@ -23,6 +24,72 @@ from .memory import RomBlock
 #    | | \| |    \__/  |
 
 
+# map from the rows of a constant logic cover to the value it drives
+_BLIF_CONST_COVERS = {
+    (): 0,  # const "FALSE"
+    ('1',): 1,  # const "TRUE"
+}
+
+# map from the rows of a logic cover to the gate it describes, as a
+# function from the input wires to the output value
+_BLIF_COVER_GATES = {
+    ('1', '1'): lambda a: a,  # simple wire
+    ('0', '1'): lambda a: ~ a,  # not gate
+    ('11', '1'): lambda a, b: a & b,  # and gate
+    ('00', '1'): lambda a, b: ~ (a | b),  # nor gate
+    ('1-', '1', '-1', '1'): lambda a, b: a | b,  # or gate
+    ('10', '1', '01', '1'): lambda a, b: a ^ b,  # xor gate
+    ('1-0', '1', '-11', '1'): lambda a, b, s: (a & ~ s) | (b & s),  # mux
+    ('-00', '1', '0-0', '1'): lambda a, b, c: (~b & ~c) | (~a & ~c),
+}
+
+
+def _strip_bit_index(name):
+    """ Return name without a trailing bit index, e.g. "out[3]" becomes "out". """
+    if name.endswith(']'):
+        head, sep, index = name.rpartition('[')
+        if sep and index[:-1].isdigit():
+            return head
+    return name
+
+
+def _tokenize_blif(blif_string):
+    """ Yield a (command, fields) tuple for each command in a blif string.
+
+    Comments are stripped, lines ending in a backslash are joined with the
+    line that follows, and the cover rows following a ".names" are collected
+    so that its fields are the tuple (signal_list, cover_list).
+    """
+    names = None
+    continued = []
+    for line in blif_string.split('\n'):
+        line = line.partition('#')[0].strip()
+        if line.endswith('\\'):
+            continued.append(line[:-1])
+            continue
+        if continued:
+            continued.append(line)
+            line = ' '.join(continued)
+            continued = []
+        fields = line.split()
+        if not fields:
+            continue
+        if fields[0].startswith('.'):
+            if names is not None:
+                yield names
+                names = None
+            if fields[0] == '.names':
+                names = ('.names', (fields[1:], []))
+            else:
+                yield fields[0], fields[1:]
+        elif names is not None:
+            names[1][1].extend(fields)
+        else:
+            raise PyrtlError('blif cover "%s" found outside of a .names command' % line)
+    if names is not None:
+        yield names
+
+
 def input_from_blif(blif, block=None, merge_io_vectors=True):
     """ Read an open blif file or string as input, updating the block appropriately
 
@@ -31,11 +98,6 @@ def input_from_blif(blif, block=None, merge_io_vectors=True):
     Assumes that output is generated by Yosys with formals in a particular order
     Ignores reset signal (which it assumes is input only to the flip flops)
     """
-    import pyparsing
-    import six
-    from pyparsing import (Word, Literal, OneOrMore, ZeroOrMore,
-                           Suppress, Group, Keyword)
-
     block = working_block(block)
 
     try:
@@ -46,64 +108,23 @@ def input_from_blif(blif, block=None, merge_io_vectors=True):
         else:
             raise PyrtlError('input_blif expecting either open file or string')
 
-    def SKeyword(x):
-        return Suppress(Keyword(x))
-
-    def SLiteral(x):
-        return Suppress(Literal(x))
+    wire_cache = {}  # map from name->wirevector for names already seen by twire
 
     def twire(x):
         """ find or make wire named x and return it """
-        s = block.get_wirevector_by_name(x)
+        s = wire_cache.get(x)
         if s is None:
-            s = WireVector(bitwidth=1, name=x)
+            s = block.get_wirevector_by_name(x)
+            if s is None:
+                s = WireVector(bitwidth=1, name=x)
+            wire_cache[x] = s
         return s
 
-    # Begin BLIF language definition
-    signal_start = pyparsing.alphas + '$:[]_<>\\\/'
-    signal_middle = pyparsing.alphas + pyparsing.nums + '$:[]_<>\\\/.'
-    signal_id = Word(signal_start, signal_middle)
-    header = SKeyword('.model') + signal_id('model_name')
-    input_list = Group(SKeyword('.inputs') + OneOrMore(signal_id))('input_list')
-    output_list = Group(SKeyword('.outputs') + OneOrMore(signal_id))('output_list')
-
-    cover_atom = Word('01-')
-    cover_list = Group(ZeroOrMore(cover_atom))('cover_list')
-    namesignal_list = Group(OneOrMore(signal_id))('namesignal_list')
-    name_def = Group(SKeyword('.names') + namesignal_list + cover_list)('name_def')
-
-    # asynchronous Flip-flop
-    dffas_formal = (SLiteral('C=') + signal_id('C') +
-                    SLiteral('R=') + signal_id('R') +
-                    SLiteral('D=') + signal_id('D') +
-                    SLiteral('Q=') + signal_id('Q'))
-    dffas_keyword = SKeyword('$_DFF_PN0_') | SKeyword('$_DFF_PP0_')
-    dffas_def = Group(SKeyword('.subckt') + dffas_keyword + dffas_formal)('dffas_def')
-
-    # synchronous Flip-flop
-    dffs_def = Group(SKeyword('.latch') +
-                     signal_id('D') +
-                     signal_id('Q') +
-                     SLiteral('re') +
-                     signal_id('C'))('dffs_def')
-    command_def = name_def | dffas_def | dffs_def
-    command_list = Group(OneOrMore(command_def))('command_list')
-
-    footer = SKeyword('.end')
-    model_def = Group(header + input_list + output_list + command_list + footer)
-    model_list = OneOrMore(model_def)
-    parser = model_list.ignore(pyparsing.pythonStyleComment)
-
-    # Begin actually reading and parsing the BLIF file
-    result = parser.parseString(blif_string, parseAll=True)
-    # Blif file with multiple models (currently only handles one flattened models)
-    assert(len(result) == 1)
     clk_set = set([])
     ff_clk_set = set([])
 
-    def extract_inputs(model):
-        start_names = [re.sub(r'\[([0-9]+)\]$', '', x) for x in model['input_list']]
-        name_counts = collections.Counter(start_names)
+    def extract_inputs(input_list):
+        name_counts = collections.Counter(_strip_bit_index(x) for x in input_list)
         for input_name in name_counts:
             bitwidth = name_counts[input_name]
             if input_name == 'clk':
@@ -111,99 +132,105 @@ def input_from_blif(blif, block=None, merge_io_vectors=True):
             elif not merge_io_vectors or bitwidth == 1:
                 block.add_wirevector(Input(bitwidth=1, name=input_name))
             else:
+                # the bits are read straight from the slices of the merged input
                 wire_in = Input(bitwidth=bitwidth, name=input_name, block=block)
                 for i in range(bitwidth):
                     bit_name = input_name + '[' + str(i) + ']'
-                    bit_wire = WireVector(bitwidth=1, name=bit_name, block=block)
-                    bit_wire <<= wire_in[i]
+                    wire_cache[bit_name] = wire_in[i]
 
-    def extract_outputs(model):
-        start_names = [re.sub(r'\[([0-9]+)\]$', '', x) for x in model['output_list']]
-        name_counts = collections.Counter(start_names)
+    def extract_outputs(output_list):
+        name_counts = collections.Counter(_strip_bit_index(x) for x in output_list)
         for output_name in name_counts:
             bitwidth = name_counts[output_name]
             if not merge_io_vectors or bitwidth == 1:
                 block.add_wirevector(Output(bitwidth=1, name=output_name))
             else:
                 wire_out = Output(bitwidth=bitwidth, name=output_name, block=block)
-                bit_list = []
-                for i in range(bitwidth):
-                    bit_name = output_name + '[' + str(i) + ']'
-                    bit_wire = WireVector(bitwidth=1, name=bit_name, block=block)
-                    bit_list.append(bit_wire)
-                wire_out <<= concat(*bit_list)
-
-    def extract_commands(model):
-        # for each "command" (dff or net) in the model
-        for command in model['command_list']:
-            # if it is a net (specified as a cover)
-            if command.getName() == 'name_def':
-                extract_cover(command)
-            # else if the command is a d flop flop
-            elif command.getName() == 'dffas_def' or command.getName() == 'dffs_def':
-                extract_flop(command)
-            else:
-                raise PyrtlError('unknown command type')
-
-    def extract_cover(command):
-        netio = command['namesignal_list']
-        if len(command['cover_list']) == 0:
-            output_wire = twire(netio[0])
-            output_wire <<= Const(0, bitwidth=1, block=block)  # const "FALSE"
-        elif command['cover_list'].asList() == ['1']:
-            output_wire = twire(netio[0])
-            output_wire <<= Const(1, bitwidth=1, block=block)  # const "TRUE"
-        elif command['cover_list'].asList() == ['1', '1']:
+                wire_out <<= concat(*[twire(output_name + '[' + str(i) + ']')
+                                      for i in range(bitwidth)])
+
+    def extract_cover(netio, cover_list):
+        cover_list = tuple(cover_list)
+        if cover_list not in _BLIF_CONST_COVERS and cover_list not in _BLIF_COVER_GATES:
+            raise PyrtlError('Blif file with unknown logic cover set "%s"'
+                             '(currently gates are hard coded)' % list(cover_list))
+        # each row of a cover is an input plane followed by an output value
+        num_inputs = len(cover_list[0]) if len(cover_list) > 1 else 0
+        if len(netio) != num_inputs + 1:
+            raise PyrtlError('Blif .names "%s" needs %d input(s) and one output for '
+                             'logic cover set "%s"'
+                             % (' '.join(netio), num_inputs, list(cover_list)))
+        if cover_list == ('1', '1'):
             # Populate clock list if one input is already a clock
             if(netio[1] in clk_set):
                 clk_set.add(netio[0])
+                return
             elif(netio[0] in clk_set):
                 clk_set.add(netio[1])
-            else:
-                output_wire = twire(netio[1])
-                output_wire <<= twire(netio[0])  # simple wire
-        elif command['cover_list'].asList() == ['0', '1']:
-            output_wire = twire(netio[1])
-            output_wire <<= ~ twire(netio[0])  # not gate
-        elif command['cover_list'].asList() == ['11', '1']:
-            output_wire = twire(netio[2])
-            output_wire <<= twire(netio[0]) & twire(netio[1])  # and gate
-        elif command['cover_list'].asList() == ['00', '1']:
-            output_wire = twire(netio[2])
-            output_wire <<= ~ (twire(netio[0]) | twire(netio[1]))  # nor gate
-        elif command['cover_list'].asList() == ['1-', '1', '-1', '1']:
-            output_wire = twire(netio[2])
-            output_wire <<= twire(netio[0]) | twire(netio[1])  # or gate
-        elif command['cover_list'].asList() == ['10', '1', '01', '1']:
-            output_wire = twire(netio[2])
-            output_wire <<= twire(netio[0]) ^ twire(netio[1])  # xor gate
-        elif command['cover_list'].asList() == ['1-0', '1', '-11', '1']:
-            output_wire = twire(netio[3])
-            output_wire <<= (twire(netio[0]) & ~ twire(netio[2])) \
-                | (twire(netio[1]) & twire(netio[2]))   # mux
-        elif command['cover_list'].asList() == ['-00', '1', '0-0', '1']:
-            output_wire = twire(netio[3])
-            output_wire <<= (~twire(netio[1]) & ~twire(netio[2])) \
-                | (~twire(netio[0]) & ~twire(netio[2]))
+                return
+        if cover_list in _BLIF_CONST_COVERS:
+            value = Const(_BLIF_CONST_COVERS[cover_list], bitwidth=1, block=block)
         else:
-            raise PyrtlError('Blif file with unknown logic cover set "%s"'
-                             '(currently gates are hard coded)' % command['cover_list'])
+            value = _BLIF_COVER_GATES[cover_list](*[twire(x) for x in netio[:-1]])
+        output_wire = twire(netio[-1])
+        output_wire <<= value
 
-    def extract_flop(command):
-        if(command['C'] not in ff_clk_set):
-            ff_clk_set.add(command['C'])
+    def extract_flop(D, Q, C):
+        if(C not in ff_clk_set):
+            ff_clk_set.add(C)
 
         # Create register and assign next state to D and output to Q
-        regname = command['Q'] + '_reg'
+        regname = Q + '_reg'
         flop = Register(bitwidth=1, name=regname)
-        flop.next <<= twire(command['D'])
-        flop_output = twire(command['Q'])
+        flop.next <<= twire(D)
+        flop_output = twire(Q)
         flop_output <<= flop
 
-    for model in result:
-        extract_inputs(model)
-        extract_outputs(model)
-        extract_commands(model)
+    def extract_latch(fields):
+        # synchronous Flip-flop
+        if len(fields) != 4 or fields[2] != 're':
+            raise PyrtlError('Blif latch "%s" is not a rising edge flip-flop' % ' '.join(fields))
+        extract_flop(D=fields[0], Q=fields[1], C=fields[3])
+
+    def extract_subckt(fields):
+        # asynchronous Flip-flop
+        if not fields or fields[0] not in ('$_DFF_PN0_', '$_DFF_PP0_'):
+            raise PyrtlError('Blif subckt "%s" is not a supported flip-flop' % ' '.join(fields))
+        formals = dict(f.partition('=')[::2] for f in fields[1:])
+        try:
+            extract_flop(D=formals['D'], Q=formals['Q'], C=formals['C'])
+        except KeyError as e:
+            raise PyrtlError('Blif subckt "%s" is missing formal %s' % (' '.join(fields), e))
+
+    # Begin actually reading and parsing the BLIF file
+    models = 0
+    in_model = False
+    for command, fields in _tokenize_blif(blif_string):
+        if command == '.model':
+            # Blif file with multiple models (currently only handles one flattened models)
+            models += 1
+            if models > 1:
+                raise PyrtlError('Blif file with multiple models (only a single '
+                                 'flattened model is supported)')
+            in_model = True
+        elif not in_model:
+            raise PyrtlError('blif command "%s" found outside of a .model' % command)
+        elif command == '.inputs':
+            extract_inputs(fields)
+        elif command == '.outputs':
+            extract_outputs(fields)
+        elif command == '.names':
+            extract_cover(*fields)
+        elif command == '.latch':
+            extract_latch(fields)
+        elif command == '.subckt':
+            extract_subckt(fields)
+        elif command == '.end':
+            in_model = False
+        else:
+            raise PyrtlError('unknown blif command "%s"' % command)
+    if models == 0 or in_model:
+        raise PyrtlError('Blif file must contain a model from .model through .end')
 
 
 # ----------------------------------------------------------------
@@ -399,38 +426,29 @@ def net_graph(block=None, split_state=False):
     block = working_block(block)
     from .wire import Register
     # self.sanity_check()
-    graph = {}
 
     # add all of the nodes
-    for net in block.logic:
-        graph[net] = {}
+    graph = {net: {} for net in block.logic}
 
     wire_src_dict, wire_dst_dict = block.net_connections()
-    dest_set = set(wire_src_dict.keys())
-    arg_set = set(wire_dst_dict.keys())
-    dangle_set = dest_set.symmetric_difference(arg_set)
-    for w in dangle_set:
+    # key views support the set operations below without first copying the keys
+    dest_set = six.viewkeys(wire_src_dict)
+    arg_set = six.viewkeys(wire_dst_dict)
+    for w in dest_set ^ arg_set:
         graph[w] = {}
     if split_state:
         for w in block.wirevector_subset(Register):
             graph[w] = {}
 
-    # add all of the edges
+    # add all of the edges (every wire here has both a source and a sink)
     for w in (dest_set & arg_set):
-        try:
-            _from = wire_src_dict[w]
-        except Exception:
-            _from = w
         if split_state and isinstance(w, Register):
             _from = w
-
-        try:
-            _to_list = wire_dst_dict[w]
-        except Exception:
-            _to_list = [w]
-
-        for _to in _to_list:
-            graph[_from][_to] = w
+        else:
+            _from = wire_src_dict[w]
+        edges = graph[_from]
+        for _to in wire_dst_dict[w]:
+            edges[_to] = w
 
     return graph
 
@@ -441,11 +459,12 @@ def output_to_trivialgraph(file, namer=_trivialgraph_default_namer, block=None):
     node_index_map = {}  # map node -> index
 
     # print the list of nodes
+    lines = []
     for index, node in enumerate(graph):
-        print('%d %s' % (index, namer(node, is_edge=False)), file=file)
+        lines.append('%d %s' % (index, namer(node, is_edge=False)))
         node_index_map[node] = index
 
-    print('#', file=file)
+    lines.append('#')
 
     # print the list of edges
     for _from in graph:
@@ -453,7 +472,10 @@ def output_to_trivialgraph(file, namer=_trivialgraph_default_namer, block=None):
             from_index = node_index_map[_from]
             to_index = node_index_map[_to]
             edge = graph[_from][_to]
-            print('%d %d %s' % (from_index, to_index, namer(edge)), file=file)
+            lines.append('%d %d %s' % (from_index, to_index, namer(edge)))
+
+    lines.append('')
+    file.write('\n'.join(lines))
 
 
 def _graphviz_default_namer(thing, is_edge=True, is_to_splitmerge=False):
@@ -512,19 +534,19 @@ def block_to_graphviz_string(block=None, namer=_graphviz_default_namer):
     graph = net_graph(block, split_state=True)
     node_index_map = {}  # map node -> index
 
-    rstring = """\
+    lines = ["""\
               digraph g {\n
               graph [splines="spline"];
               node [shape=circle, style=filled, fillcolor=lightblue1,
                     fontcolor=grey, fontname=helvetica, penwidth=0,
                     fixedsize=true];
               edge [labelfloat=false, penwidth=2, color=deepskyblue, arrowsize=.5];
-              """
+              """]
 
     # print the list of nodes
     for index, node in enumerate(graph):
         label = namer(node, is_edge=False)
-        rstring += '    n%s %s;\n' % (index, label)
+        lines.append('    n%s %s;\n' % (index, label))
         node_index_map[node] = index
 
     # print the list of edges
@@ -535,10 +557,10 @@ def block_to_graphviz_string(block=None, namer=_graphviz_default_namer):
             edge = graph[_from][_to]
             is_to_splitmerge = True if hasattr(_to, 'op') and _to.op in 'cs' else False
             label = namer(edge, is_to_splitmerge=is_to_splitmerge)
-            rstring += '   n%d -> n%d %s;\n' % (from_index, to_index, label)
+            lines.append('   n%d -> n%d %s;\n' % (from_index, to_index, label))
 
-    rstring += '}\n'
-    return rstring
+    lines.append('}\n')
+    return ''.join(lines)
 
 
 def block_to_svg(block=None):
@@ -577,22 +599,21 @@ def trace_to_html(simtrace, trace_list=None, sortkey=None):
         )
 
     def extract(w):
+        # walk the trace one run of repeated values at a time, marking the start
+        # of each run and continuing it with a '.' for every repeated cycle
         wavelist = []
         datalist = []
-        last = None
-        for i, value in enumerate(trace[w]):
-            if last == value:
-                wavelist.append('.')
+        for value, run in itertools.groupby(trace[w]):
+            if len(w) == 1:
+                wavelist.append(str(value))
             else:
-                if len(w) == 1:
-                    wavelist.append(str(value))
-                else:
-                    wavelist.append('=')
-                    datalist.append(value)
-                last = value
+                wavelist.append('=')
+                datalist.append(value)
+            wavelist.append('.' * (sum(1 for _ in run) - 1))
 
         wavestring = ''.join(wavelist)
-        datastring = ', '.join(['"%d"' % data for data in datalist])
+        # quote the whole list at once rather than formatting each value separately
+        datastring = '"%s"' % '", "'.join(map(str, datalist)) if datalist else ''
         if len(w) == 1:
             return bool_signal_template % (w, wavestring)
         else:
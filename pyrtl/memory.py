@@ -217,7 +217,7 @@ class MemBlock(_MemReadBase):
         addr = item
 
         if isinstance(val, MemBlock.EnabledWrite):
-            data, enable = val.data, val.enable
+            data, enable = val
         else:
             data, enable = val, Const(1, bitwidth=1)
         data = as_wires(data, bitwidth=self.bitwidth, truncating=False)
@@ -274,7 +274,9 @@ class RomBlock(_MemReadBase):
         :param int bitwidth: The bitwidth of each item stored in the ROM
         :param int addrwidth: The bitwidth of the address bus (determines number of addresses)
         :param romdata: This can either be a function or an array (iterable) that maps
-          an address as an input to a result as an output
+          an address as an input to a result as an output.  Any indexable sequence
+          works, and the data is used as is rather than copied, so compact sequences
+          such as `array.array` or `bytearray` keep large ROMs small
         :param str name: The identifier for the memory
         :param max_read_ports: limits the number of read ports each block can create;
             passing `None` indicates there is no limit
@@ -295,6 +297,7 @@ class RomBlock(_MemReadBase):
         super(RomBlock, self).__init__(bitwidth, addrwidth, name, max_read_ports,
                                        asynchronous, block)
         self.data = romdata
+        self._data_func_values = {}  # values already computed by a romdata function
         self.build_new_roms = build_new_roms
         self.current_copy = self
         self.pad_with_zeros = pad_with_zeros
@@ -315,6 +318,8 @@ class RomBlock(_MemReadBase):
         except TypeError:
             raise PyrtlError("Address: {} with invalid type specified".format(address))
         if isinstance(self.data, types.FunctionType):
+            if address in self._data_func_values:
+                return self._data_func_values[address]
             try:
                 value = self.data(address)
             except Exception:
@@ -343,6 +348,10 @@ class RomBlock(_MemReadBase):
         except TypeError:
             raise PyrtlError("Value: {} from rom {} has an invalid type"
                              .format(value, self))
+        if isinstance(self.data, types.FunctionType):
+            # only call the function once per address, no matter how many times
+            # the rom is simulated or exported
+            self._data_func_values[address] = value
         return value
 
     def _build_read_port(self, addr):
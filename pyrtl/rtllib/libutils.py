@@ -20,6 +20,24 @@ def partition_wire(wire, partition_size):
     return [wire[offset:offset + partition_size] for offset in range(0, len(wire), partition_size)]
 
 
+def enabled_inc(reg, enable):
+    """ Returns reg plus one when enable is high and reg unchanged otherwise.
+
+    :param WireVector reg: the value to be incremented (usually a register)
+    :param WireVector enable: one bit signal that chooses whether to increment
+    :return: WireVector of the same bitwidth as reg (the increment wraps around)
+
+    Computes the same thing as `select(enable, truecase=reg + 1, falsecase=reg)`,
+    but by adding the enable bit itself to reg, so it is built out of a single
+    adder rather than an adder and a mux.\n
+    Use: `counter.next <<= enabled_inc(counter, enable)`
+    """
+    enable = pyrtl.as_wires(enable, bitwidth=1, truncating=False)
+    if len(enable) != 1:
+        raise pyrtl.PyrtlError("enable must be exactly 1 bit, not {}".format(len(enable)))
+    return (reg + enable)[:len(reg)]
+
+
 def str_to_int_array(string, base=16):
     """
     Converts a string to an array of integer values according to the
@@ -64,7 +64,9 @@ class Simulation(object):
           the roms specified. Format: {Register: value}.
         :param memory_value_map: Defines initial values for many
           addresses in a single or multiple memory. Format: {Memory: {address: Value}}.
-          Memory is a memory block, address is the address of a value
+          Memory is a memory block, address is the address of a value.  The
+          {address: Value} maps are copied, so the same map can be used to
+          initialize more than one memory
         :param default_value: is the value that all unspecified registers and
           memories will initialize to. If no default_value is specified, it will
           use the value stored in the object (default to 0)
@@ -130,7 +132,7 @@ class Simulation(object):
                     raise PyrtlError('error, one or more of the memories in the map is a RomBlock')
                 if isinstance(self.block, PostSynthBlock):
                     mem = self.block.mem_map[mem]  # pylint: disable=maybe-no-member
-                self.memvalue[mem.id] = mem_map
+                self.memvalue[mem.id] = dict(mem_map)  # copy so the map can be shared
                 max_addr_val, max_bit_val = 2**mem.addrwidth, 2**mem.bitwidth
                 for (addr, val) in mem_map.items():
                     if addr < 0 or addr >= max_addr_val:
@@ -145,7 +147,8 @@ class Simulation(object):
             if w not in self.value:
                 self.value[w] = default_value
 
-        self.ordered_nets = tuple((i for i in self.block))
+        # registers and memory write ports are updated separately at the end of each step
+        self.ordered_nets = tuple((i for i in self.block if i.op not in 'r@'))
         self.reg_update_nets = tuple((self.block.logic_subset('r')))
         self.mem_update_nets = tuple((self.block.logic_subset('@')))
 
@@ -217,6 +220,21 @@ class Simulation(object):
         # raise the appropriate exceptions
         check_rtl_assertions(self)
 
+    def step_multiple(self, provided_inputs, nsteps=None):
+        """ Take the simulation forward many cycles
+
+        :param provided_inputs: a dictionary mapping wirevectors (or their names)
+          to a sequence of values, one for each step
+        :param nsteps: the number of steps to take (defaults to the length of
+          the value sequences, which must then all be the same length)
+
+        Example: if we have inputs named 'a' and 'x', we can call:
+        sim.step_multiple({'a': [1, 0], 'x': [23, 7]}) to simulate two cycles,
+        the first with values 1 and 23 and the second with values 0 and 7
+        """
+        for step_inputs in _inputs_per_step(provided_inputs, nsteps):
+            self.step(step_inputs)
+
     def inspect(self, w):
         """ Get the value of a wirevector in the last simulation cycle.
 
@@ -260,7 +278,9 @@ class Simulation(object):
         of the primitive ops. Function updates self.value accordingly.
         """
         if net.op in 'r@':
-            return  # registers and memory write ports have no logic function
+            # these are filtered out of ordered_nets, as they have no logic function
+            raise PyrtlInternalError('error, registers and memory write ports '
+                                     'cannot be executed as combinational logic')
         elif net.op in self.simple_func:
             argvals = (self.value[arg] for arg in net.args)
             result = self.simple_func[net.op](*argvals)
@@ -306,6 +326,31 @@ class Simulation(object):
             self.memvalue[memid][write_addr] = write_val
 
 
+def _inputs_per_step(provided_inputs, nsteps=None):
+    """ Split a map of {wire: sequence of values} into an iterator of {wire: value} maps.
+
+    If nsteps is None, all of the sequences must be the same length, and that
+    length is the number of steps.  The inputs are checked right away, but the
+    map for each step is only built as the iterator reaches it.
+    """
+    if nsteps is None:
+        if not provided_inputs:
+            raise PyrtlError('step_multiple needs nsteps to be specified '
+                             'when no input sequences are given')
+        lengths = set(len(values) for values in provided_inputs.values())
+        if len(lengths) != 1:
+            raise PyrtlError('step_multiple needs input sequences of one common length '
+                             '(or nsteps must be specified)')
+        nsteps = lengths.pop()
+    for wire, values in provided_inputs.items():
+        if len(values) < nsteps:
+            raise PyrtlError('step_multiple was given %d values for "%s" but %d steps'
+                             % (len(values), getattr(wire, 'name', wire), nsteps))
+    items = list(provided_inputs.items())
+    return ({wire: values[step] for wire, values in items}
+            for step in range(nsteps))
+
+
 # ----------------------------------------------------------------
 #    ___       __  ___     __
 #   |__   /\  /__`  |     /__` |  |\/|
@@ -394,7 +439,7 @@ class FastSimulation(object):
             for (mem, mem_map) in memory_value_map.items():
                 if isinstance(mem, RomBlock):
                     raise PyrtlError('error, one or more of the memories in the map is a RomBlock')
-                self.mems[self._mem_varname(mem)] = mem_map
+                self.mems[self._mem_varname(mem)] = dict(mem_map)
 
         for net in self.block.logic_subset('m@'):
             mem = net.op_param[1]
@@ -438,6 +483,18 @@ class FastSimulation(object):
         # check the rtl assertions
         check_rtl_assertions(self)
 
+    def step_multiple(self, provided_inputs, nsteps=None):
+        """ Run the simulation for many cycles
+
+        :param provided_inputs: a dictionary mapping WireVectors (or their names)
+          to a sequence of values, one for each step
+          eg: {wire: [3, 4], "wire_name": [17, 0]}
+        :param nsteps: the number of steps to take (defaults to the length of
+          the value sequences)
+        """
+        for step_inputs in _inputs_per_step(provided_inputs, nsteps):
+            self.step(step_inputs)
+
     def inspect(self, w):
         """ Get the value of a wirevector in the last simulation cycle.
 
@@ -502,6 +559,22 @@ class FastSimulation(object):
         else:
             return self._varname(wire)
 
+    @staticmethod
+    def _packed_rom(rom):
+        """ Return the contents of a ROM packed into a single int of at most 64 bits.
+
+        Entry n is stored in bits n*bitwidth and up.  Returns None if the ROM is too big
+        to fit or if any of its entries is invalid (so that the error is still raised
+        on the read of that entry).
+        """
+        if rom.bitwidth << rom.addrwidth > 64:
+            return None
+        try:
+            values = [rom._get_read_data(addr) for addr in range(1 << rom.addrwidth)]
+        except PyrtlError:
+            return None
+        return sum(val << (addr * rom.bitwidth) for addr, val in enumerate(values))
+
     _no_mask_bitwidth = {  # bitwidth that the dest has to have in order to not need masking
         'w': lambda net: len(net.args[0]),
         'r': lambda net: len(net.args[0]),
@@ -603,7 +676,11 @@ class FastSimulation(object):
                 read_addr = self._arg_varname(net.args[0])
                 mem = net.op_param[1]
                 if isinstance(net.op_param[1], RomBlock):
-                    expr = 'd["%s"]._get_read_data(%s)' % (self._mem_varname(mem), read_addr)
+                    packed = self._packed_rom(mem)
+                    if packed is not None:  # read a small rom with a shift (masked below)
+                        expr = '(%d >> (%s * %d))' % (packed, read_addr, mem.bitwidth)
+                    else:
+                        expr = 'd["%s"]._get_read_data(%s)' % (self._mem_varname(mem), read_addr)
                 else:  # memories act async for reads
                     expr = 'd["%s"].get(%s, %s)' % (self._mem_varname(mem),
                                                     read_addr, self.default_value)
@@ -950,17 +1027,14 @@ class SimulationTrace(object):
         renderer = render_cls()
 
         def formatted_trace_line(wire, trace):
-            heading = wire.rjust(maxnamelen) + ' '
-            trace_line = ''
-            for i in range(len(trace)):
+            wv = self._wires[wire]
+            render_val = renderer.render_val
+            pieces = [wire.rjust(maxnamelen) + ' ']
+            for i, val in enumerate(trace):
                 if (i % segment_size == 0) and i > 0:
-                    trace_line += segment_delim
-                trace_line += renderer.render_val(
-                    self._wires[wire],
-                    i % segment_size,
-                    trace[i],
-                    symbol_len)
-            return heading + trace_line
+                    pieces.append(segment_delim)
+                pieces.append(render_val(wv, i % segment_size, val, symbol_len))
+            return ''.join(pieces)
 
         # default to printing all signals in sorted order
         if trace_list is None:
@@ -982,12 +1056,14 @@ class SimulationTrace(object):
         spaces = ' '*(maxnamelen+1)
         ticks = [renderer.tick_segment(n, symbol_len, segment_size)
                  for n in range(0, maxtracelen, segment_size)]
-        print(spaces + segment_delim.join(ticks), file=file)
+        lines = [spaces + segment_delim.join(ticks)]
 
-        # now all the traces
+        # now all the traces, collected and written out all at once
         for w in trace_list:
             if extra_line:
-                print(file=file)
-            print(formatted_trace_line(w, self.trace[w]), file=file)
+                lines.append('')
+            lines.append(formatted_trace_line(w, self.trace[w]))
         if extra_line:
-            print(file=file)
+            lines.append('')
+        lines.append('')  # end the last line
+        file.write('\n'.join(lines))
@@ -7,6 +7,7 @@ accordingly, or write information from the Block out to the file.
 """
 
 from __future__ import print_function, unicode_literals
+import collections
 
 from .pyrtlexceptions import PyrtlError, PyrtlInternalError
 from .core import working_block, _NameSanitizer
@@ -28,17 +29,20 @@ def output_to_verilog(dest_file, block=None):
     file = dest_file
     internal_names = _VerilogSanitizer('_verout_tmp_')
 
-    for wire in block.wirevector_set:
-        internal_names.make_valid_string(wire.name)
+    # map each wire directly to its verilog name, computed once up front
+    verilog_names = {wire: internal_names.make_valid_string(wire.name)
+                     for wire in block.wirevector_set}
+    varname = verilog_names.__getitem__
 
-    def varname(wire):
-        return internal_names[wire.name]
-
-    _to_verilog_header(file, block, varname)
-    _to_verilog_combinational(file, block, varname)
-    _to_verilog_sequential(file, block, varname)
-    _to_verilog_memories(file, block, varname)
-    _to_verilog_footer(file)
+    # build the whole module as a list of lines and write it out at once
+    lines = []
+    _to_verilog_header(lines, block, varname)
+    _to_verilog_combinational(lines, block, varname)
+    _to_verilog_sequential(lines, block, varname)
+    _to_verilog_memories(lines, block, varname)
+    _to_verilog_footer(lines)
+    file.write('\n'.join(lines))
+    file.write('\n')
 
 
 def OutputToVerilog(dest_file, block=None):
@@ -47,7 +51,7 @@ def OutputToVerilog(dest_file, block=None):
 
 
 class _VerilogSanitizer(_NameSanitizer):
-    _ver_regex = '[_A-Za-z][_a-zA-Z0-9\$]*$'
+    _ver_regex = r'[_A-Za-z][_a-zA-Z0-9\$]*$'
 
     _verilog_reserved = \
         """always and assign automatic begin buf bufif0 bufif1 case casex casez cell cmos
@@ -92,7 +96,7 @@ def _verilog_block_parts(block):
     return inputs, outputs, registers, wires, memories
 
 
-def _to_verilog_header(file, block, varname):
+def _to_verilog_header(lines, block, varname):
     """ Print the header of the verilog implementation. """
 
     def name_sorted(wires):
@@ -101,9 +105,9 @@ def _to_verilog_header(file, block, varname):
     def name_list(wires):
         return [varname(w) for w in wires]
 
-    print('// Generated automatically via PyRTL', file=file)
-    print('// As one initial test of synthesis, map to FPGA with:', file=file)
-    print('//   yosys -p "synth_xilinx -top toplevel" thisfile.v\n', file=file)
+    lines.append('// Generated automatically via PyRTL')
+    lines.append('// As one initial test of synthesis, map to FPGA with:')
+    lines.append('//   yosys -p "synth_xilinx -top toplevel" thisfile.v\n')
 
     inputs, outputs, registers, wires, memories = _verilog_block_parts(block)
 
@@ -112,129 +116,136 @@ def _to_verilog_header(file, block, varname):
     if any(w.startswith('tmp') for w in io_list):
         raise PyrtlError('input or output with name starting with "tmp" indicates unnamed IO')
     io_list_str = ', '.join(io_list)
-    print('module toplevel({:s});'.format(io_list_str), file=file)
+    lines.append('module toplevel({:s});'.format(io_list_str))
 
     # inputs and outputs
-    print('    input clk;', file=file)
+    lines.append('    input clk;')
     for w in name_sorted(inputs):
-        print('    input{:s} {:s};'.format(_verilog_vector_decl(w), varname(w)), file=file)
+        lines.append('    input{:s} {:s};'.format(_verilog_vector_decl(w), varname(w)))
     for w in name_sorted(outputs):
-        print('    output{:s} {:s};'.format(_verilog_vector_decl(w), varname(w)), file=file)
-    print('', file=file)
+        lines.append('    output{:s} {:s};'.format(_verilog_vector_decl(w), varname(w)))
+    lines.append('')
 
     # memories and registers
     for m in memories:
         memwidth_str = _verilog_vector_size_decl(m.bitwidth)
         memsize_str = _verilog_vector_size_decl(1 << m.addrwidth)
-        print('    reg{:s} mem_{}{:s}; //{}'.format(memwidth_str, m.id,
-                                                    memsize_str, m.name), file=file)
+        lines.append('    reg{:s} mem_{}{:s}; //{}'.format(memwidth_str, m.id,
+                                                           memsize_str, m.name))
     for w in registers:
-        print('    reg{:s} {:s};'.format(_verilog_vector_decl(w), varname(w)), file=file)
-    print('', file=file)
+        lines.append('    reg{:s} {:s};'.format(_verilog_vector_decl(w), varname(w)))
+    lines.append('')
 
     # wires
     for w in wires:
-        print('    wire{:s} {:s};'.format(_verilog_vector_decl(w), varname(w)), file=file)
-    print('', file=file)
+        lines.append('    wire{:s} {:s};'.format(_verilog_vector_decl(w), varname(w)))
+    lines.append('')
 
     # Write the initial values for read-only memories.
     # If we ever add support outside of simulation for initial values
     #  for MemBlocks, that would also go here.
     roms = {m for m in memories if isinstance(m, RomBlock)}
     for m in roms:
-        print('    initial begin', file=file)
-        for i in range(1 << m.addrwidth):
-            mem_elem_str = 'mem_{}[{:d}]'.format(m.id, i)
-            mem_data_str = "{:d}'h{:x}".format(m.bitwidth, m._get_read_data(i))
-            print('        {:s}={:s};'.format(mem_elem_str, mem_data_str), file=file)
-        print('    end', file=file)
-        print('', file=file)
+        lines.append('    initial begin')
+        # fill in the parts shared by every entry once, leaving only address and data
+        entry_template = "        mem_%s[%%d]=%d'h%%x;" % (m.id, m.bitwidth)
+        read_data = m._get_read_data
+        lines.extend(entry_template % (i, read_data(i)) for i in range(1 << m.addrwidth))
+        lines.append('    end')
+        lines.append('')
+
+
+# ops of the nets handled by each case of _to_verilog_combinational
+_UNARY_OPS = frozenset('w~')
+_BINARY_OPS = frozenset('&|^+-*<>')
+_STATE_OPS = frozenset('rm@')  # registers and memories, emitted elsewhere
 
 
-def _to_verilog_combinational(file, block, varname):
+def _to_verilog_combinational(lines, block, varname):
     """ Print the combinational logic of the verilog implementation. """
-    print('    // Combinational', file=file)
+    lines.append('    // Combinational')
 
     # assign constants (these could be folded for readability later)
     for const in block.wirevector_subset(Const):
-        print('    assign {:s} = {:d};'.format(varname(const), const.val), file=file)
+        lines.append('    assign {:s} = {:d};'.format(varname(const), const.val))
 
     # walk the block and output combination logic
+    append = lines.append  # bound once, as it is called for every net
     for net in block.logic:
-        if net.op in 'w~':  # unary ops
-            opstr = '' if net.op == 'w' else net.op
-            t = (varname(net.dests[0]), opstr, varname(net.args[0]))
-            print('    assign %s = %s%s;' % t, file=file)
-        elif net.op in '&|^+-*<>':  # binary ops
-            t = (varname(net.dests[0]), varname(net.args[0]),
-                 net.op, varname(net.args[1]))
-            print('    assign %s = %s %s %s;' % t, file=file)
-        elif net.op == '=':
-            t = (varname(net.dests[0]), varname(net.args[0]),
-                 varname(net.args[1]))
-            print('    assign %s = %s == %s;' % t, file=file)
-        elif net.op == 'x':
+        op, args = net.op, net.args
+        if op in _STATE_OPS:
+            continue  # do nothing for registers and memories
+        dest = varname(net.dests[0])
+        if op in _UNARY_OPS:
+            opstr = '' if op == 'w' else op
+            append('    assign %s = %s%s;' % (dest, opstr, varname(args[0])))
+        elif op in _BINARY_OPS:
+            t = (dest, varname(args[0]), op, varname(args[1]))
+            append('    assign %s = %s %s %s;' % t)
+        elif op == '=':
+            append('    assign %s = %s == %s;' % (dest, varname(args[0]), varname(args[1])))
+        elif op == 'x':
             # note that the argument order for 'x' is backwards from the ternary operator
-            t = (varname(net.dests[0]), varname(net.args[0]),
-                 varname(net.args[2]), varname(net.args[1]))
-            print('    assign %s = %s ? %s : %s;' % t, file=file)
-        elif net.op == 'c':
-            catlist = ', '.join([varname(w) for w in net.args])
-            t = (varname(net.dests[0]), catlist)
-            print('    assign %s = {%s};' % t, file=file)
-        elif net.op == 's':
+            t = (dest, varname(args[0]), varname(args[2]), varname(args[1]))
+            append('    assign %s = %s ? %s : %s;' % t)
+        elif op == 'c':
+            catlist = ', '.join([varname(w) for w in args])
+            append('    assign %s = {%s};' % (dest, catlist))
+        elif op == 's':
             # someone please check if we need this special handling for scalars
-            catlist = ', '.join([varname(net.args[0]) + '[%s]' % str(i)
-                                if len(net.args[0]) > 1 else varname(net.args[0])
+            catlist = ', '.join([varname(args[0]) + '[%s]' % str(i)
+                                if len(args[0]) > 1 else varname(args[0])
                                 for i in reversed(net.op_param)])
-            t = (varname(net.dests[0]), catlist)
-            print('    assign %s = {%s};' % t, file=file)
-        elif net.op in 'rm@':
-            pass  # do nothing for registers and memories
+            append('    assign %s = {%s};' % (dest, catlist))
         else:
-            raise PyrtlInternalError("nets with op '{}' not supported".format(net.op))
-    print('', file=file)
+            raise PyrtlInternalError("nets with op '{}' not supported".format(op))
+    append('')
 
 
-def _to_verilog_sequential(file, block, varname):
+def _to_verilog_sequential(lines, block, varname):
     """ Print the sequential logic of the verilog implementation. """
-    print('    // Registers', file=file)
-    print('    always @( posedge clk )', file=file)
-    print('    begin', file=file)
+    lines.append('    // Registers')
+    lines.append('    always @( posedge clk )')
+    lines.append('    begin')
     for net in block.logic:
         if net.op == 'r':
             dest, src = (varname(net.dests[0]), varname(net.args[0]))
-            print('        {:s} <= {:s};'.format(dest, src), file=file)
-    print('    end', file=file)
-    print('', file=file)
+            lines.append('        {:s} <= {:s};'.format(dest, src))
+    lines.append('    end')
+    lines.append('')
 
 
-def _to_verilog_memories(file, block, varname):
+def _to_verilog_memories(lines, block, varname):
     """ Print the memories of the verilog implementation. """
-    memories = {n.op_param[1] for n in block.logic_subset('m@')}
-    for m in memories:
-        print('    // Memory mem_{}: {}'.format(m.id, m.name), file=file)
-        print('    always @( posedge clk )', file=file)
-        print('    begin', file=file)
-        for net in block.logic_subset('@'):
-            if net.op_param[1] == m:
-                t = (varname(net.args[2]), net.op_param[0],
-                     varname(net.args[0]), varname(net.args[1]))
-                print(('        if (%s) begin\n'
-                       '                mem_%s[%s] <= %s;\n'
-                       '        end') % t, file=file)
-        print('    end', file=file)
-        for net in block.logic_subset('m'):
-            if net.op_param[1] == m:
-                dest = varname(net.dests[0])
-                m_id = net.op_param[0]
-                index = varname(net.args[0])
-                print('    assign {:s} = mem_{}[{:s}];'.format(dest, m_id, index), file=file)
-        print('', file=file)
-
-
-def _to_verilog_footer(file):
-    print('endmodule\n', file=file)
+    # sort the memory ports by memory id in a single pass over the nets
+    memories = {}
+    write_nets = collections.defaultdict(list)
+    read_nets = collections.defaultdict(list)
+    for net in block.logic_subset('m@'):
+        memid, m = net.op_param
+        memories[memid] = m
+        (write_nets if net.op == '@' else read_nets)[memid].append(net)
+
+    for memid, m in memories.items():
+        lines.append('    // Memory mem_{}: {}'.format(m.id, m.name))
+        lines.append('    always @( posedge clk )')
+        lines.append('    begin')
+        for net in write_nets[memid]:
+            t = (varname(net.args[2]), memid,
+                 varname(net.args[0]), varname(net.args[1]))
+            lines.append(('        if (%s) begin\n'
+                          '                mem_%s[%s] <= %s;\n'
+                          '        end') % t)
+        lines.append('    end')
+        for net in read_nets[memid]:
+            dest = varname(net.dests[0])
+            index = varname(net.args[0])
+            lines.append('    assign {:s} = mem_{}[{:s}];'.format(dest, memid, index))
+        lines.append('')
+
+
+def _to_verilog_footer(lines):
+    lines.append('endmodule\n')
 
 
 # ----------------------------------------------------------------
@@ -279,67 +290,70 @@ def output_verilog_testbench(dest_file, simulation_trace=None, vcd="waveform.vcd
 
     inputs, outputs, registers, wires, memories = _verilog_block_parts(block)
 
-    ver_name = _VerilogSanitizer('_ver_out_tmp_')
-    for wire in block.wirevector_set:
-        ver_name.make_valid_string(wire.name)
+    internal_names = _VerilogSanitizer('_ver_out_tmp_')
+    ver_name = {wire: internal_names.make_valid_string(wire.name)
+                for wire in block.wirevector_set}
+
+    # Build the testbench as a list of lines and write it out at once
+    lines = []
 
     # Output header
-    print('module tb();', file=dest_file)
+    lines.append('module tb();')
 
     # Declare all block inputs as reg
-    print('    reg clk;', file=dest_file)
+    lines.append('    reg clk;')
     for w in inputs:
-        print('    reg {:s} {:s};'.format(_verilog_vector_decl(w), ver_name[w.name]),
-              file=dest_file)
+        lines.append('    reg {:s} {:s};'.format(_verilog_vector_decl(w), ver_name[w]))
 
     # Declare all block outputs as wires
     for w in outputs:
-        print('    wire {:s} {:s};'.format(_verilog_vector_decl(w), ver_name[w.name]),
-              file=dest_file)
-    print('', file=dest_file)
+        lines.append('    wire {:s} {:s};'.format(_verilog_vector_decl(w), ver_name[w]))
+    lines.append('')
 
     # Declare an integer used for init of memories
-    print('    integer tb_iter;', file=dest_file)
+    lines.append('    integer tb_iter;')
 
     # Instantiate logic block
-    io_list = [ver_name[w.name] for w in block.wirevector_subset((Input, Output))]
+    io_list = [ver_name[w] for w in block.wirevector_subset((Input, Output))]
     io_list.append('clk')
     io_list_str = ['.{0:s}({0:s})'.format(w) for w in io_list]
-    print('    toplevel block({:s});\n'.format(', '.join(io_list_str)), file=dest_file)
+    lines.append('    toplevel block({:s});\n'.format(', '.join(io_list_str)))
 
     # Generate clock signal
-    print('    always', file=dest_file)
-    print('        #5 clk = ~clk;\n', file=dest_file)
+    lines.append('    always')
+    lines.append('        #5 clk = ~clk;\n')
 
     # Move through all steps of trace, writing out input assignments per cycle
-    print('    initial begin', file=dest_file)
+    lines.append('    initial begin')
 
     # If a VCD output is requested, set that up
     if vcd:
-        print('        $dumpfile ("%s");' % vcd, file=dest_file)
-        print('        $dumpvars;\n', file=dest_file)
+        lines.append('        $dumpfile ("%s");' % vcd)
+        lines.append('        $dumpvars;\n')
 
     # Initialize clk, and all the registers and memories
-    print('        clk = 0;', file=dest_file)
+    lines.append('        clk = 0;')
     for r in registers:
-        print('        block.%s = 0;' % ver_name[r.name], file=dest_file)
+        lines.append('        block.%s = 0;' % ver_name[r])
     for m in memories:
-        print('        for(tb_iter=0;tb_iter<%d;tb_iter++) begin block.mem_%s[tb_iter] = 0; end' %
-              (1 << m.addrwidth, m.id), file=dest_file)
+        lines.append('        for(tb_iter=0;tb_iter<%d;tb_iter++) '
+                     'begin block.mem_%s[tb_iter] = 0; end' % (1 << m.addrwidth, m.id))
 
     if simulation_trace:
         tracelen = max(len(t) for t in simulation_trace.trace.values())
+        # the name, width prefix, and trace of each input are looked up once, not every cycle
+        input_traces = [('        ' + ver_name[w] + " = {:d}'d".format(len(w)),
+                         simulation_trace.trace[w]) for w in inputs]
         for i in range(tracelen):
-            for w in inputs:
-                print('        {:s} = {:s}{:d};'.format(
-                    ver_name[w.name],
-                    "{:d}'d".format(len(w)),
-                    simulation_trace.trace[w][i]), file=dest_file)
+            for assign_str, values in input_traces:
+                lines.append('{:s}{:d};'.format(assign_str, values[i]))
             if cmd:
-                print('        %s' % cmd, file=dest_file)
-            print('\n        #10', file=dest_file)
+                lines.append('        %s' % cmd)
+            lines.append('\n        #10')
 
     # Footer
-    print('        $finish;', file=dest_file)
-    print('    end', file=dest_file)
-    print('endmodule', file=dest_file)
+    lines.append('        $finish;')
+    lines.append('    end')
+    lines.append('endmodule')
+    lines.append('')
+    dest_file.write('\n'.join(lines))
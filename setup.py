@@ -11,9 +11,6 @@ setup(
     download_url = 'https://github.com/UCSBarchlab/PyRTL/tarball/0.8.7',  #VERSION
     install_requires =  ['six'],
     tests_require =  ['tox','nose'],
-    extras_require =  {
-        'blif parsing': ['pyparsing']
-        },
     classifiers = [
         'Development Status :: 4 - Beta',
         'Environment :: Console',
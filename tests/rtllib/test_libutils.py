@@ -34,6 +34,31 @@ class TestPartitionWire(unittest.TestCase):
             self.assertEqual(tuple(out_vals[wire]), true_vals[index])
 
 
+class TestEnabledInc(unittest.TestCase):
+
+    def setUp(self):
+        pyrtl.reset_working_block()
+
+    def test_enabled_inc_sim(self):
+        counter = pyrtl.Register(3, 'counter')
+        enable = pyrtl.Input(1, 'enable')
+        counter.next <<= libutils.enabled_inc(counter, enable)
+        sim_trace = pyrtl.SimulationTrace()
+        sim = pyrtl.Simulation(tracer=sim_trace)
+        for en in [1, 1, 0, 1, 1, 1, 1, 1, 1, 0, 1]:
+            sim.step({enable: en})
+        self.assertEqual(sim_trace.trace['counter'], [0, 1, 2, 2, 3, 4, 5, 6, 7, 0, 0])
+
+    def test_enabled_inc_bitwidth(self):
+        counter = pyrtl.Register(5, 'counter')
+        self.assertEqual(len(libutils.enabled_inc(counter, pyrtl.Input(1))), 5)
+
+    def test_wide_enable_error(self):
+        counter = pyrtl.Register(3, 'counter')
+        with self.assertRaises(pyrtl.PyrtlError):
+            libutils.enabled_inc(counter, pyrtl.Input(2))
+
+
 class TestStringConversion(unittest.TestCase):
 
     def test_simple_conversion(self):
@@ -104,6 +104,74 @@ class TestInputFromBlif(unittest.TestCase):
         pyrtl.input_from_blif(state_machine_blif)
         io = pyrtl.working_block().wirevector_subset((pyrtl.Input, pyrtl.Output))
 
+    def test_strip_bit_index(self):
+        strip = inputoutput._strip_bit_index
+        self.assertEqual(strip('out[12]'), 'out')
+        self.assertEqual(strip('a[0][3]'), 'a[0]')
+        for name in ('out', 'out[]', 'out[x]', 'out[1]b', 'out1]'):
+            self.assertEqual(strip(name), name)
+
+    def test_blif_comments_and_continuations(self):
+        blif = (".model top  # a comment\n"
+                ".inputs a \\\n"
+                "  b clk\n"
+                ".outputs o\n"
+                ".names a b n\n"
+                "10 1\n"
+                "01 1\n"
+                ".latch n o re clk\n"
+                ".end\n")
+        pyrtl.input_from_blif(blif)
+        block = pyrtl.working_block()
+        self.assertEqual(len(block.wirevector_subset(pyrtl.Input)), 2)
+        self.assertEqual(len(block.wirevector_subset(pyrtl.Register)), 1)
+        self.assertEqual(len(block.logic_subset('^')), 1)
+
+    def test_blif_merged_io_vectors(self):
+        blif = (".model top\n.inputs a[0] a[1]\n.outputs o[0] o[1]\n"
+                ".names a[0] a[1] o[0]\n11 1\n"
+                ".names a[0] a[1] o[1]\n11 1\n.end\n")
+        pyrtl.input_from_blif(blif)
+        block = pyrtl.working_block()
+        self.assertIsNone(block.get_wirevector_by_name('a[0]'))
+        sim_trace = pyrtl.SimulationTrace()
+        sim = pyrtl.Simulation(tracer=sim_trace)
+        for a in range(4):
+            sim.step({'a': a})
+        self.assertEqual(sim_trace.trace['o'], [0, 0, 0, 3])
+
+    def test_blif_unknown_cover_raises_error(self):
+        blif = ".model top\n.inputs a b\n.outputs o\n.names a b o\n10 1\n.end\n"
+        with self.assertRaises(pyrtl.PyrtlError):
+            pyrtl.input_from_blif(blif)
+
+    def test_blif_cover_with_too_many_inputs_raises_error(self):
+        blif = ".model top\n.inputs a b c\n.outputs o\n.names a b c o\n11 1\n.end\n"
+        with self.assertRaises(pyrtl.PyrtlError):
+            pyrtl.input_from_blif(blif)
+
+    def test_blif_names_without_signals_raises_error(self):
+        blif = ".model top\n.inputs a\n.outputs o\n.names\n.end\n"
+        with self.assertRaises(pyrtl.PyrtlError):
+            pyrtl.input_from_blif(blif)
+
+    def test_blif_wire_cover_with_one_signal_raises_error(self):
+        blif = ".model top\n.inputs a\n.outputs o\n.names o\n1 1\n.end\n"
+        with self.assertRaises(pyrtl.PyrtlError):
+            pyrtl.input_from_blif(blif)
+
+    def test_blif_without_model_or_end_raises_error(self):
+        for blif in (".inputs a\n.outputs o\n.names a o\n1 1\n.end\n",
+                     ".model top\n.inputs a\n.outputs o\n.names a o\n1 1\n"):
+            pyrtl.reset_working_block()
+            with self.assertRaises(pyrtl.PyrtlError):
+                pyrtl.input_from_blif(blif)
+
+    def test_blif_multiple_models_raises_error(self):
+        blif = ".model m1\n.inputs a\n.outputs o\n.end\n.model m2\n.end\n"
+        with self.assertRaises(pyrtl.PyrtlError):
+            pyrtl.input_from_blif(blif)
+
 
 class TestOutputGraphs(unittest.TestCase):
     def setUp(self):
@@ -170,6 +238,14 @@ class TestNetGraph(unittest.TestCase):
         g = inputoutput.net_graph()
         self.assertEquals(len(g), 0)
 
+    def test_netgraph_multiple_drivers(self):
+        inwire = pyrtl.Input(1, "inwire")
+        tempwire = pyrtl.WireVector(1, "tempwire")
+        tempwire <<= inwire
+        tempwire <<= ~inwire
+        with self.assertRaises(pyrtl.PyrtlError):
+            inputoutput.net_graph()
+
 
 class TestVerilogNames(unittest.TestCase):
     def setUp(self):
@@ -356,6 +356,26 @@ class RTLRomGetReadData(unittest.TestCase):
         for address, expected in enumerate((1, 3, 5, 7, 1)):
             self.assertEqual(romf._get_read_data(address), expected)
 
+    def test_data_function_called_once_per_address(self):
+        calls = []
+
+        def rom_func(address):
+            calls.append(address)
+            return (2 * address + 1) % 8
+        rom = pyrtl.RomBlock(3, 3, rom_func)
+        for repeat in range(3):
+            for address in range(8):
+                self.assertEqual(rom._get_read_data(address), (2 * address + 1) % 8)
+        self.assertEqual(calls, list(range(8)))
+
+    def test_valid_get_read_compact_data(self):
+        import array
+        for data in (array.array('B', [2, 4, 7, 1]), bytearray([2, 4, 7, 1])):
+            rom = pyrtl.RomBlock(3, 3, data)
+            for address, expected in enumerate((2, 4, 7, 1)):
+                self.assertEqual(rom._get_read_data(address), expected)
+            self.invalid_rom_read(rom, 5)
+
     def test_build_new_roms(self):
         width = 6
         rom = pyrtl.RomBlock(6, 6, [2, 4, 7, 1], build_new_roms=True)
@@ -302,6 +302,44 @@ class SimInputValidationBase(unittest.TestCase):
             sim_trace = pyrtl.SimulationTrace()
 
 
+class StepMultipleBase(unittest.TestCase):
+    def setUp(self):
+        pyrtl.reset_working_block()
+        self.a = pyrtl.Input(bitwidth=3, name='a')
+        self.b = pyrtl.Input(bitwidth=3, name='b')
+        self.o = pyrtl.Output(name='o')
+        self.o <<= self.a + self.b
+
+    def test_step_multiple(self):
+        sim_trace = pyrtl.SimulationTrace()
+        sim = self.sim(tracer=sim_trace)
+        sim.step_multiple({'a': [0, 1, 2, 3], self.b: [4, 5, 6, 7]})
+        output = six.StringIO()
+        sim_trace.print_trace(output)
+        self.assertEqual(output.getvalue(), '--- Values in base 10 ---\n'
+                                            'a  0  1  2  3\n'
+                                            'b  4  5  6  7\n'
+                                            'o  4  6  8 10\n')
+
+    def test_step_multiple_nsteps(self):
+        sim_trace = pyrtl.SimulationTrace()
+        sim = self.sim(tracer=sim_trace)
+        sim.step_multiple({'a': [0, 1, 2, 3], 'b': [4, 5, 6]}, nsteps=2)
+        self.assertEqual(sim_trace.trace['o'], [4, 6])
+
+    def test_step_multiple_mismatched_lengths(self):
+        sim = self.sim(tracer=pyrtl.SimulationTrace())
+        with self.assertRaises(pyrtl.PyrtlError):
+            sim.step_multiple({'a': [0, 1, 2, 3], 'b': [4, 5, 6]})
+        with self.assertRaises(pyrtl.PyrtlError):
+            sim.step_multiple({'a': [0, 1, 2, 3], 'b': [4, 5, 6]}, nsteps=4)
+
+    def test_step_multiple_no_inputs_needs_nsteps(self):
+        sim = self.sim(tracer=pyrtl.SimulationTrace())
+        with self.assertRaises(pyrtl.PyrtlError):
+            sim.step_multiple({})
+
+
 class TraceWithAdderBase(unittest.TestCase):
     def setUp(self):
         pyrtl.reset_working_block()
@@ -543,6 +581,25 @@ class MemBlockBase(unittest.TestCase):
         # check consistency of memory_value_map assignment, insertion, and modification
         self.assertEquals(sim.inspect_mem(self.mem1), {0: 0, 1: 2, 2: 3, 3: 3, 4: 4, 5: 5})
 
+    def test_mem_val_map_shared(self):
+        read_addr3 = pyrtl.Input(self.addrwidth)
+        self.output3 = pyrtl.Output(self.bitwidth, "o3")
+        self.output3 <<= self.mem2[read_addr3]
+        mem_init = {0: 1, 1: 2}
+        mem_val_map = {self.mem1: mem_init, self.mem2: mem_init}
+        self.sim_trace = pyrtl.SimulationTrace()
+        sim = self.sim(tracer=self.sim_trace, memory_value_map=mem_val_map)
+        sim.step({
+            self.read_addr1: 0,
+            self.read_addr2: 0,
+            read_addr3: 0,
+            self.write_addr: 0,  # only mem1 has a write port
+            self.write_data: 5
+        })
+        self.assertEqual(sim.inspect_mem(self.mem1), {0: 5, 1: 2})
+        self.assertEqual(sim.inspect_mem(self.mem2), {0: 1, 1: 2})
+        self.assertEqual(mem_init, {0: 1, 1: 2})
+
     def test_mem_val_map_defaults(self):
         read_addr3 = pyrtl.Input(self.addrwidth)
         self.output3 = pyrtl.Output(self.bitwidth, "o3")